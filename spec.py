@@ -5,24 +5,29 @@ import json
 import logging
 import os
 from pathlib import Path
-
-import jsonref
-from rich.logging import RichHandler
+from typing import Iterable, Iterator
 
 from toolspec import ToolSpec
 from util import methods, text
 
-logging.getLogger().handlers.clear()
-logging.basicConfig(
-    level=logging.INFO, format="%(message)s", datefmt="[%X]", handlers=[RichHandler()]
-)
 logger = logging.getLogger(__name__)
 
 
-def openapi_to_requests(openapi_spec):
-    """Convert function's OpenAPI spec into requests' parameters spec"""
+def _param_obj(param):
+    """Convert an OpenAPI parameter into a property object"""
+    schema = param.get("schema") or {"type": param.get("type", "string")}
+    return {**schema, **{k: v for k, v in param.items() if k not in ("name", "in", "schema")}}
+
+
+def openapi_to_requests(openapi_spec) -> Iterator[tuple[str, dict]]:
+    """
+    Convert function's OpenAPI spec into requests' parameters spec
+
+    :param openapi_spec: OpenAPI spec with JSON references already replaced
+        by plain objects, e.g. loaded by `jsonref.loads(..., proxies=False)`.
+    :return: Generator of (operationId, function spec) pairs.
+    """
 
-    functions = {}
     function_name = "requests"
 
     servers_urls = [s["url"] for s in openapi_spec["servers"]]
@@ -35,8 +40,8 @@ def openapi_to_requests(openapi_spec):
                 params_common_list = spec_with_ref
                 continue
 
-            # 1. Resolve JSON references.
-            spec = jsonref.replace_refs(spec_with_ref)
+            # 1. JSON references are resolved once on the whole document on load
+            spec = spec_with_ref
 
             # 2. Extract a name for the functions.
             operation_id = spec.get("operationId")
@@ -44,6 +49,21 @@ def openapi_to_requests(openapi_spec):
             operation_id=text.normalize_string(operation_id)
 
             logger.debug("Path [%s] method [%s] operationId [%s]", path, method, operation_id)
+
+            headers, query = {}, {}
+            for param in params_common_list + spec.get("parameters", []):
+                location = param["in"]
+                if location == "header":
+                    headers[param["name"]] = _param_obj(param)
+                elif location == "query":
+                    query[param["name"]] = _param_obj(param)
+
+            request_body = spec.get("requestBody")
+            content = request_body.get("content") if request_body else None
+            # 'application/json', 'application/x-www-form-urlencoded', ...
+            media_type = next(iter(content)) if content else None
+            data = content[media_type].get("schema", {}).get("properties", {}) if media_type else {}
+
             function = {
                 "name": f"{function_name}.{method}",
                 "description": f"Sends a {method.upper()} request to the specified URL.",
@@ -58,47 +78,19 @@ def openapi_to_requests(openapi_spec):
                             ],
                             "required": True
                         },
-                        "headers": {
-                            param["name"]: {
-                                **(param.get("schema") if "schema" in param else {"type": param["type"]}),
-                                **{
-                                    k: v
-                                    for k, v in param.items()
-                                    if k not in ["name", "in", "schema"]
-                                },
-                            }
-                            for param in params_common_list + spec.get("parameters", [])
-                            if param["in"] == "header"
-                        },
+                        "headers": headers,
                         "timeout": {
                             "type": ["number", "tuple"],
                             "description": "How many seconds to wait for the server to send data before giving up.",
                             "required": False,
                         },
-                        "params": {
-                            param["name"]: {
-                                **(param.get("schema") if "schema" in param else {"type": param["type"]}),
-                                **{
-                                    k: v
-                                    for k, v in param.items()
-                                    if k not in ["name", "in", "schema"]
-                                },
-                            }
-                            for param in params_common_list + spec.get("parameters", [])
-                            if param["in"] == "query"
-                        },
-                        "data": spec.get("requestBody").get("content")
-                            # 'application/json', 'application/x-www-form-urlencoded', ...
-                            .get(next(iter(spec.get("requestBody").get("content"))))
-                            .get("schema").get("properties")
-                            if "requestBody" in spec else {}
+                        "params": query,
+                        "data": data,
                     },
                 },
             }
 
-            functions[operation_id] = function
-
-    return functions
+            yield operation_id, function
 
 def modules_to_spec(module_name, class_name):
     """Create function specs for Python methods in module or module.class"""
@@ -134,15 +126,16 @@ def modules_to_spec(module_name, class_name):
 
     return functions
 
-def write_specs(functions, fname_base, dest_dir:str="functions"):
-    """Write function specs to JSON files"""
+def write_specs(functions: Iterable[tuple[str, dict]], fname_base, dest_dir:str="functions"):
+    """Write (function_name, function spec) pairs to JSON files"""
     # To be more LLM context friendly, one API per JSON file
-    for function_name, function in functions.items():
-        fname = f"{function_name}.json"
-        os.makedirs(f"{dest_dir}/{fname_base}", exist_ok=True)
-        with open(f"{dest_dir}/{fname_base}/{fname}", "w", encoding="utf-8") as of:
-            of.write(json.dumps(function, indent=4))
-        logger.info("Output: %s", f"{dest_dir}/{fname_base}/{fname}")
+    out_dir = Path(dest_dir) / fname_base
+    os.makedirs(out_dir, exist_ok=True)
+    for function_name, function in functions:
+        out_file = out_dir / f"{function_name}.json"
+        with open(out_file, "w", encoding="utf-8") as of:
+            json.dump(function, of, indent=4)
+        logger.info("Output: %s", out_file)
 
 
 def main():
@@ -172,6 +165,8 @@ def main():
         case v if 1 <= v:
             log_level_root = logging.DEBUG
     # Configure logging for global
+    from rich.logging import RichHandler
+
     logging.getLogger().handlers.clear()
     logging.basicConfig(
         level=log_level_root,
@@ -182,9 +177,12 @@ def main():
 
     # Create spec for REST API from OpenAPI spec
     if args.source_file:
+        import jsonref
+
         with open(args.source_file, encoding="utf-8") as f:
-            # it's important to load with jsonref, as explained below
-            openapi_spec = jsonref.loads(f.read())
+            # Resolve JSON references once into plain objects, which
+            # openapi_to_requests and the JSON encoder can use directly
+            openapi_spec = jsonref.loads(f.read(), proxies=False)
         functions = openapi_to_requests(openapi_spec)
         write_specs(functions, Path(args.source_file).stem, args.dest_dir)
 
@@ -195,7 +193,7 @@ def main():
         module_name=p[0]
         class_name = p[1] if len(p) == 2 else None
         functions = modules_to_spec(module_name, class_name)
-        write_specs(functions, module_name, args.dest_dir)
+        write_specs(functions.items(), module_name, args.dest_dir)
 
 if __name__ == "__main__":
     main()
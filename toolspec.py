@@ -1,18 +1,83 @@
 """Represents Tool Specification"""
 
+import inspect
 import json
+import re
 from dataclasses import dataclass
 from typing import Optional
 
-from docstring_parser import parse
-from llama_index.core.tools.types import ToolMetadata
-
-
-@dataclass
-class ToolMetadataWithSpec(ToolMetadata):
-    """Override ToolMetadata to add spec data"""
-
-    tool_spec: Optional[str] = None
+_REST_META_RE = re.compile(r"^:", re.M)
+# Sphinx fields: ':param [type] name: description', ':type name: type', ...
+_REST_FIELD_RE = re.compile(r"^:(\w+)((?:\s+[^\s:]+){0,2})\s*:\s*(.*)$")
+# Google/NumPy section headers or Epydoc fields, left to style auto-detection
+_OTHER_STYLE_RE = re.compile(r"^\w[\w ]*:\s*$|^-{3,}\s*$|^@", re.M)
+_REST_PARAM_KEYWORDS = {"param", "parameter", "arg", "argument", "attribute", "key", "keyword"}
+
+
+def _parse_rest_docstring(docstring: str):
+    """
+    Fast path for Sphinx style docstrings whose fields are all single line.
+
+    :return: (long_description, [(arg_name, type_name, description, is_optional)]),
+        or None when the docstring should go through docstring_parser instead.
+    """
+    if not docstring:
+        return None
+    text = inspect.cleandoc(docstring)
+    meta = _REST_META_RE.search(text)
+    if not meta or _OTHER_STYLE_RE.search(text, 0, meta.start()):
+        return None
+
+    params = []
+    types = {}
+    for line in text[meta.start():].splitlines():
+        match = _REST_FIELD_RE.match(line)
+        if not match:
+            # Multi-line field, or anything else unexpected
+            return None
+        key, args, desc = match.group(1), match.group(2).split(), match.group(3).strip()
+        if key == "type" and len(args) == 1:
+            types[args[0]] = desc
+        elif key in _REST_PARAM_KEYWORDS:
+            if len(args) == 2:
+                type_name, arg_name = args
+                is_optional = type_name.endswith("?")
+                if is_optional:
+                    type_name = type_name[:-1]
+            elif len(args) == 1:
+                type_name, arg_name, is_optional = None, args[0], None
+            else:
+                return None
+            params.append([arg_name, type_name, desc, is_optional])
+    if not params:
+        return None
+
+    for param in params:
+        param[1] = param[1] or types.get(param[0])
+
+    parts = text[: meta.start()].split("\n", 1)
+    long_description = parts[1].strip() or None if len(parts) > 1 else None
+    return long_description, params
+
+
+def __getattr__(name):
+    # Define ToolMetadataWithSpec on first access, so that importing this
+    # module does not pull in llama_index
+    if name == "ToolMetadataWithSpec":
+        from llama_index.core.tools.types import ToolMetadata
+
+        @dataclass
+        class ToolMetadataWithSpec(ToolMetadata):
+            """Override ToolMetadata to add spec data"""
+
+            tool_spec: Optional[str] = None
+
+        # Publish as a module-level class, so it pickles like one
+        ToolMetadataWithSpec.__qualname__ = name
+        ToolMetadataWithSpec.__module__ = __name__
+        globals()[name] = ToolMetadataWithSpec
+        return ToolMetadataWithSpec
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class ToolSpec:
@@ -43,17 +108,27 @@ class ToolSpec:
         """
         self.name = name
 
-        doc_dict = parse(docstring)
-        self.description = doc_dict.long_description
+        parsed = _parse_rest_docstring(docstring)
+        if parsed:
+            self.description, params = parsed
+        else:
+            from docstring_parser import parse
 
-        for param in doc_dict.params:
+            doc_dict = parse(docstring)
+            self.description = doc_dict.long_description
+            params = [
+                (p.arg_name, p.type_name, p.description, p.is_optional)
+                for p in doc_dict.params
+            ]
+
+        for arg_name, type_name, description, is_optional in params:
             param_obj = {
-                "type": param.type_name,
-                "description": param.description,
+                "type": type_name,
+                "description": description,
             }
-            self.param_props[param.arg_name] = param_obj
-            if not param.is_optional and "optional" not in param.description:
-                self.param_required.append(param.arg_name)
+            self.param_props[arg_name] = param_obj
+            if not is_optional and "optional" not in description:
+                self.param_required.append(arg_name)
 
     def create_from_schema_json(self, function_spec: dict):
         """
@@ -85,17 +160,10 @@ class ToolSpec:
 
     def get_spec_dict(self, function_tag: bool = False):
         """Return a dict for spec"""
-        if not self.param_props:
-            self.param_props = {}
-
         spec = {
             "name": self.name,
             "description": self.description,
-            "parameters": {
-                "type": "object",
-                "properties": {k: v for k, v in self.param_props.items()},
-                "required": self.param_required,
-            },
+            "parameters": self._get_parameters(),
         }
 
         if function_tag:
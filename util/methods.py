@@ -1,15 +1,32 @@
 """Utilities for methods in modules and classes"""
 
 import ast
+import hashlib
 import importlib.util
 import inspect
 import logging
+import mmap
 import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
-from typing import List
+from itertools import chain
+from pathlib import Path
+from typing import Dict, List
 
 logger = logging.getLogger(__name__)
 
+# Parsed module sources for find_method_direct, by module name
+_AST_CACHE: Dict[str, ast.Module] = {}
+
+# Packages with fewer files are scanned in-process
+PARALLEL_MIN_FILES = 64
+
+# Disk cache of find_method_in_packages results, per package.
+# Bump METHODS_CACHE_VERSION when the search rules or FoundMethod change.
+METHODS_CACHE_DIR = Path.home() / ".cache" / "autofunc" / "methods"
+METHODS_CACHE_VERSION = 2
+
 
 @dataclass
 class FoundMethod:
@@ -30,30 +47,24 @@ def parse_function_arguments(func_node):
     args_info = {}
     arguments = func_node.args
 
-    # Handle positional arguments
-    for arg in arguments.args:
+    # Handle positional arguments, defaults align to the last ones
+    default_index = len(arguments.args) - len(arguments.defaults)
+    for i, arg in enumerate(arguments.args):
         arg_name = arg.arg
         arg_default = None
-        if arguments.defaults:
-            default_index = len(arguments.args) - len(arguments.defaults)
-            if arguments.args.index(arg) >= default_index:
-                arg_default = arguments.defaults[
-                    arguments.args.index(arg) - default_index
-                ]
-                arg_default = ast.literal_eval(arg_default)
+        if i >= default_index:
+            arg_default = ast.literal_eval(arguments.defaults[i - default_index])
         args_info[arg_name] = {
             "default": arg_default,
             "annotation": ast.dump(arg.annotation) if arg.annotation else None,
         }
 
     # Handle keyword-only arguments
-    for kwarg in arguments.kwonlyargs:
+    for i, kwarg in enumerate(arguments.kwonlyargs):
         kwarg_name = kwarg.arg
-        kwarg_default = None
-        if arguments.kw_defaults:
-            kwarg_default = arguments.kw_defaults[arguments.kwonlyargs.index(kwarg)]
-            if kwarg_default is not None:
-                kwarg_default = ast.literal_eval(kwarg_default)
+        kwarg_default = arguments.kw_defaults[i]
+        if kwarg_default is not None:
+            kwarg_default = ast.literal_eval(kwarg_default)
         args_info[kwarg_name] = {
             "default": kwarg_default,
             "annotation": ast.dump(kwarg.annotation) if kwarg.annotation else None,
@@ -94,14 +105,21 @@ def find_method_direct(method_name_full: str, expected_num: int = 1):
     # Special case for requests
     if module_name == "requests":
         module_name = "requests.api"
-    importlib.import_module(module_name)
-    spec = importlib.util.find_spec(module_name)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
+    module = importlib.import_module(module_name)
     # method = getattr(module, method_name)
-    parsed_content = ast.parse(inspect.getsource(module))
-    for node in ast.walk(parsed_content):
+    parsed_content = _AST_CACHE.get(module_name)
+    if parsed_content is None:
+        parsed_content = ast.parse(inspect.getsource(module))
+        _AST_CACHE[module_name] = parsed_content
+    # Module level definitions first, including those under if/try blocks,
+    # then any nested definition (e.g. os.fsencode built inside _fscodec)
+    nodes = chain(_iter_statement_defs(parsed_content.body), ast.walk(parsed_content))
+    seen = set()
+    for node in nodes:
         if isinstance(node, ast.FunctionDef) and node.name == method_name:
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
             found_method = FoundMethod(
                 method_name=method_name_full,
                 func_def=node,
@@ -138,9 +156,17 @@ def find_method_in_packages(
             continue
 
         package_path = package_spec.submodule_search_locations[0]
-        methods += _find_methods_in_package(
-            package_path, package_name, method_name, class_name, expected_num
+        file_paths = sorted(str(p) for p in Path(package_path).rglob("*.py"))
+        cache_file = _methods_cache_file(
+            package_path, file_paths, package_name, method_name, class_name, expected_num
         )
+        found = _load_cached_methods(cache_file)
+        if found is None:
+            found = _find_methods_in_package(
+                file_paths, package_name, method_name, class_name, expected_num
+            )
+            _store_cached_methods(cache_file, found)
+        methods += found
 
         if len(methods) >= expected_num != -1:
             return methods
@@ -152,27 +178,122 @@ def find_method_in_packages(
     return methods
 
 
+def _methods_cache_file(
+    package_path, file_paths, package_name, method_name, class_name, expected_num
+) -> Path:
+    """
+    Cache file path for a package lookup. The name is keyed on the lookup
+    arguments, the package location (e.g. per venv), the cache version, and
+    the newest mtime of the package files and of this module, so any change
+    to the package or the search code maps to a new file.
+    """
+    max_mtime = max(
+        (os.stat(p).st_mtime_ns for p in [__file__, *file_paths]), default=0
+    )
+    key = (
+        f"{METHODS_CACHE_VERSION}:{package_path}:{package_name}:{method_name}:{class_name}:"
+        f"{expected_num}:{len(file_paths)}"
+    )
+    digest = hashlib.md5(key.encode()).hexdigest()
+    return METHODS_CACHE_DIR / f"{digest}-{max_mtime}.pkl"
+
+
+def _load_cached_methods(cache_file: Path):
+    """Load cached FoundMethod list, or None if not cached"""
+    try:
+        with open(cache_file, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        logger.debug("Ignoring unreadable cache file %s", cache_file)
+        return None
+
+
+def _store_cached_methods(cache_file: Path, methods: List[FoundMethod]):
+    """Store FoundMethod list, replacing stale caches of the same lookup"""
+    digest = cache_file.name.split("-", 1)[0]
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        for stale in cache_file.parent.glob(f"{digest}-*.pkl"):
+            stale.unlink(missing_ok=True)
+        with open(cache_file, "wb") as f:
+            pickle.dump(methods, f)
+    except OSError:
+        logger.debug("Failed to write cache file %s", cache_file)
+
+
 def _find_methods_in_package(
-    package_path, package_name, method_name, class_name, expected_num
+    file_paths, package_name, method_name, class_name, expected_num
 ) -> List[FoundMethod]:
     """
-    Find methods in a specific package path.
+    Find methods in the given files of a package.
+
+    Files are parsed in parallel worker processes when there are enough of
+    them and more than one CPU. Results are in file order; with expected_num
+    set, they are the first expected_num matches in file order.
     """
+    no_limit = expected_num == -1
+    args = (package_name, method_name, class_name, expected_num)
     methods = []
-    for root, _, files in os.walk(package_path):
-        for file in files:
-            if file.endswith(".py"):
-                file_path = os.path.join(root, file)
-                methods += _find_methods_in_file(
-                    file_path, package_name, method_name, class_name, expected_num
-                )
+    if (os.cpu_count() or 1) == 1 or len(file_paths) < PARALLEL_MIN_FILES:
+        for file_path in file_paths:
+            methods += _find_methods_in_file(file_path, *args)
+            if not no_limit and len(methods) >= expected_num:
+                return methods[:expected_num]
+        return methods
 
-                if len(methods) >= expected_num != -1:
-                    return methods
+    found = {}
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = {
+            executor.submit(_find_methods_in_file, file_path, *args): index
+            for index, file_path in enumerate(file_paths)
+        }
+        # Files before next_index are all done, and their results collected
+        next_index = 0
+        for future in as_completed(futures):
+            found[futures[future]] = future.result()
+            while next_index in found:
+                methods += found.pop(next_index)
+                next_index += 1
+            if not no_limit and len(methods) >= expected_num:
+                for pending in futures:
+                    pending.cancel()
+                return methods[:expected_num]
 
     return methods
 
 
+def _iter_statement_defs(nodes):
+    """
+    Yield class and function definitions among statement nodes, including
+    those under compound statements (if/try/with/for/match ...), without
+    walking into definition bodies or expressions.
+    """
+    for node in nodes:
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            yield node
+            continue
+        for field in ("body", "orelse", "finalbody"):
+            body = getattr(node, field, None)
+            if isinstance(body, list):
+                yield from _iter_statement_defs(body)
+        # except handlers of try, and cases of match
+        for clause in getattr(node, "handlers", []) + getattr(node, "cases", []):
+            yield from _iter_statement_defs(clause.body)
+
+
+def _iter_classes(nodes):
+    """
+    Yield class definitions among statement nodes, including nested classes,
+    without walking into function bodies.
+    """
+    for node in _iter_statement_defs(nodes):
+        if isinstance(node, ast.ClassDef):
+            yield node
+            yield from _iter_classes(node.body)
+
+
 def _find_methods_in_file(
     file_path, package_name, method_name, class_name, expected_num
 ) -> List[FoundMethod]:
@@ -180,33 +301,39 @@ def _find_methods_in_file(
     Find methods in a specific file.
     """
     methods = []
-    with open(file_path, "r", encoding="utf-8") as f:
-        try:
-            parsed_content = ast.parse(f.read())
-            for node in ast.walk(parsed_content):
-                if not isinstance(node, ast.ClassDef):
-                    continue
-                for item in node.body:
-                    if class_name and class_name != node.name:
-                        continue
-                    if not isinstance(item, ast.FunctionDef) or method_name not in [
-                        item.name,
-                        "*",
-                    ]:
-                        continue
-                    methods.append(
-                        FoundMethod(
-                            method_name=item.name,
-                            func_def=item,
-                            package_name=package_name,
-                            class_name=node.name,
-                            doc_string=ast.get_docstring(item),
-                            parameters=None,  # parse_function_arguments(item),
-                        )
-                    )
-                    if len(methods) >= expected_num != -1:
-                        return methods
+    match_all = method_name == "*"
+    no_limit = expected_num == -1
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
             return methods
-        except (SyntaxError, UnicodeDecodeError):
-            logger.error("Error parsing file %s", file_path)
-            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            # Cheap reject before the expensive parse
+            if not match_all and content.find(b"def " + method_name.encode()) == -1:
+                return methods
+            try:
+                parsed_content = ast.parse(content, filename=file_path)
+            except (SyntaxError, ValueError):
+                logger.error("Error parsing file %s", file_path)
+                return methods
+
+    for node in _iter_classes(parsed_content.body):
+        if class_name and class_name != node.name:
+            continue
+        for item in node.body:
+            if not isinstance(item, ast.FunctionDef):
+                continue
+            if not match_all and item.name != method_name:
+                continue
+            methods.append(
+                FoundMethod(
+                    method_name=item.name,
+                    func_def=item,
+                    package_name=package_name,
+                    class_name=node.name,
+                    doc_string=ast.get_docstring(item),
+                    parameters=None,  # parse_function_arguments(item),
+                )
+            )
+            if not no_limit and len(methods) >= expected_num:
+                return methods
+    return methods
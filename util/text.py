@@ -2,11 +2,14 @@
 
 import re
 
+_NORMALIZE_RE = re.compile(r"\W|^(?=\d)")
+_LEADING_RE = re.compile(r"^[A-Za-z_]")
+
 
 def normalize_string(name):
     """Replace any character that is not alphanumeric or underscore with an underscore"""
-    name = re.sub(r"\W|^(?=\d)", "_", name)
+    name = _NORMALIZE_RE.sub("_", name)
     # Ensure the name starts with a letter or underscore
-    if not re.match(r"^[A-Za-z_]", name):
+    if not _LEADING_RE.match(name):
         name = "_" + name
     return name